@@ -1,20 +1,136 @@
 #!/usr/bin/env python3
 import os
 import argparse
+import functools
+import hashlib
 import requests
 import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
 import json
-from plotly import graph_objects as go  # optional, for interactive extensions
-from matplotlib.ticker import LogLocator, NullFormatter, NullLocator
+import tempfile
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 import numpy as np
-import pandas as pd
-import requests
-import matplotlib.pyplot as plt
 
-def fetch_monthly_usage(recordset, min_date):
+# upper bound (connect, read) in seconds so one stalled endpoint can't hang the run
+REQUEST_TIMEOUT = (5, 30)
+
+# on-disk cache for completed-year windows of the annual endpoints
+CACHE_DIR = os.path.join(".cache", "idigbio")
+# a year is only cached once this long after its Dec 31, so late-aggregated
+# stats (and the Jan 1 cron run, still Dec 31 in US time) are picked up first
+SETTLE_DAYS = 31
+
+# every chart is saved the same way; fast zlib level, PNG encoding is the tail cost
+SAVEFIG_KWARGS = {"dpi": 120, "format": "png", "pil_kwargs": {"compress_level": 1}}
+
+# bump whenever a plotter's look changes (titles, colours, sizes, ...) so charts
+# whose input data is unchanged are still re-rendered; see skip_if_unchanged
+CHART_VERSION = 1
+
+
+def _lazy_plt():
+    """
+    Import pyplot on first use; matplotlib's import (font cache scan included)
+    is the slowest part of startup and isn't needed for --help or fetching.
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # headless; skip GUI backend probing
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _savefig(fig, outpath):
+    """Save fig to outpath; .svg paths are written as vectors, the rest as PNG."""
+    if outpath.endswith(".svg"):
+        fig.savefig(outpath, format="svg")  # no rasterization, dpi is moot
+    else:
+        fig.savefig(outpath, **SAVEFIG_KWARGS)
+
+
+def disk_cache(func):
+    """
+    Memoize a JSON-returning GET helper on disk, with no expiry. Only use it for
+    windows that can no longer change (years that have settled, see
+    SETTLE_DAYS). Bodies without a "dates" object are returned but not cached.
+    """
+    @functools.wraps(func)
+    def wrapper(session, url, params):
+        key = json.dumps([url, params], sort_keys=True).encode()
+        digest = hashlib.blake2b(key, digest_size=16).hexdigest()
+        path = os.path.join(CACHE_DIR, f"{digest}.json")
+        try:
+            with open(path, "rb") as fh:
+                return orjson.loads(fh.read())
+        except (OSError, ValueError):
+            pass  # missing, unreadable or corrupt -> refetch
+
+        js = func(session, url, params)
+        if not (isinstance(js, dict) and isinstance(js.get("dates"), dict)):
+            return js  # unexpected payload; never freeze it into the cache
+
+        # write to a temp file and swap it in, so readers never see a partial entry
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(orjson.dumps(js))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return js
+    return wrapper
+
+
+def _get_json(session, url, params):
+    """GET an iDigBio endpoint and return the decoded JSON body."""
+    r = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+
+_get_json_cached = disk_cache(_get_json)
+
+def _parse_dates(date_strings):
+    """Parse iDigBio's ISO-8601 date keys in a single vectorized pass."""
+    # an explicit format skips per-element inference; cache dedupes repeats
+    return pd.to_datetime(date_strings, format="ISO8601", cache=True)
+
+def skip_if_unchanged(plot):
+    """
+    Skip a plotter when its output exists and was rendered from identical input
+    by the same version of the plotter. The digest (input frame, plotter name,
+    CHART_VERSION, save settings and output format) is stored next to the chart
+    as `<outpath>.hash`; bump CHART_VERSION or delete the `.hash` file to force
+    a re-render.
+    """
+    @functools.wraps(plot)
+    def wrapper(df, outpath, *args, **kwargs):
+        h = hashlib.blake2b(digest_size=8)
+        render = [CHART_VERSION, plot.__qualname__, os.path.splitext(outpath)[1],
+                  SAVEFIG_KWARGS]
+        h.update(json.dumps(render, sort_keys=True).encode())
+        h.update(",".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+        digest = h.hexdigest()
+
+        hash_path = f"{outpath}.hash"
+        try:
+            with open(hash_path) as fh:
+                if fh.read().strip() == digest and os.path.exists(outpath):
+                    return
+        except OSError:
+            pass  # never rendered (or hash lost) -> plot
+
+        plot(df, outpath, *args, **kwargs)
+        with open(hash_path, "w") as fh:
+            fh.write(digest)
+    return wrapper
+
+def fetch_monthly_usage(session, recordset, min_date):
     """Fetch month-by-month metrics from iDigBio."""
     url = "https://search.idigbio.org/v2/summary/stats/search"
     body = {
@@ -22,29 +138,36 @@ def fetch_monthly_usage(recordset, min_date):
         "minDate":      min_date,
         "recordset":    recordset
     }
-    r = requests.post(url, json=body)
+    r = session.post(url, json=body, timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
 
-    rows = []
-    for dt, recs in r.json()["dates"].items():
-        metrics = recs.get(recordset, {})
-        row = {"Date": pd.to_datetime(dt)}
-        row.update(metrics)
-        rows.append(row)
+    dates, rows = [], []
+    for dt, recs in orjson.loads(r.content)["dates"].items():
+        dates.append(dt)
+        rows.append(recs.get(recordset, {}))
 
-    return pd.DataFrame(rows).sort_values("Date")
+    # counts may arrive as a mix of ints and gaps; keep them numeric
+    df = pd.DataFrame.from_records(rows).apply(pd.to_numeric, downcast="integer")
+    df.index = pd.DatetimeIndex(_parse_dates(dates), name="Date")
+    # monotonic DatetimeIndex lets downstream lookups take pandas' fast paths
+    return df.sort_index(kind="stable")
 
 
-def plot_usage_bar(df, outpath):
+@skip_if_unchanged
+def plot_usage_bar(df, outpath, fig, ax):
     """
     Draw a grouped bar chart of search_count vs download (records downloaded) by month,
     and label only the download bars with their numeric value.
     """
-    labels = df['Date'].dt.strftime("%Y-%m")
-    x      = np.arange(len(labels))
+    from matplotlib.ticker import LogLocator, NullFormatter, NullLocator
+
+    # format once through the vectorized period formatter; reuse for all ticks
+    labels = df.index.to_period('M').strftime("%Y-%m")
+    x      = np.arange(len(labels), dtype=np.int32)
     width  = 0.4
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.clear()
+    fig.set_size_inches(10, 6)
 
     # Plot the two bar series
     bars_search = ax.bar(x - width/2, df['search'],   width,
@@ -70,96 +193,133 @@ def plot_usage_bar(df, outpath):
     ax.set_title("Monthly Usage (Search vs Download)")
     ax.legend(loc='upper left')
 
-    plt.tight_layout()
-    plt.savefig(outpath, dpi=300)
-    plt.close()
+    fig.tight_layout()
+    _savefig(fig, outpath)
+    ax.clear()
     
-def fetch_ingest_stats(recordset, min_date, max_date):
+def _fetch_annual(session, url, recordset, min_date, max_date, keep=None):
+    """
+    Pull yearly stats from an iDigBio summary endpoint as a tidy
+    (Date, Metric, Count) frame, optionally keeping only the `keep` metrics.
+    """
+    def params(lo, hi):
+        return {
+            "dateInterval": "year",
+            "minDate":      lo,
+            "maxDate":      hi,
+            "recordset":    recordset
+        }
+
+    # Settled years (ended at least SETTLE_DAYS ago) are immutable: fetch them
+    # once and cache them forever. Everything after goes live, so last year is
+    # still refetched through January. The two windows meet at Dec 31 / Jan 1.
+    max_d = datetime.date.fromisoformat(max_date)
+    settled = max_d.year - 1
+    if max_d < datetime.date(max_d.year, 1, 1) + datetime.timedelta(days=SETTLE_DAYS):
+        settled -= 1
+    settled_end = f"{settled}-12-31"
+    live_start = max(min_date, f"{settled + 1}-01-01")
+
+    js = {}
+    if min_date <= settled_end:
+        past = _get_json_cached(session, url, params(min_date, settled_end))
+        js.update(past["dates"])
+    current = _get_json(session, url, params(live_start, max_date))
+    js.update(current["dates"])
+
+    dates, metrics, counts = [], [], []
+    for dt, rec in js.items():
+        m = rec.get(recordset, {})
+        for metric, cnt in m.items():
+            if keep is not None and metric not in keep:
+                continue
+            dates.append(dt)
+            metrics.append(metric)
+            counts.append(cnt)
+    return pd.DataFrame({
+        "Date":   _parse_dates(dates),
+        "Metric": metrics,
+        "Count":  pd.to_numeric(counts, downcast="integer")
+    })
+
+
+def fetch_ingest_stats(session, recordset, min_date, max_date):
     """Pull annual ingestion (records only) from iDigBio—skip mediarecords."""
-    url = "https://search.idigbio.org/v2/summary/stats/api/"
-    params = {
-        "dateInterval": "year",
-        "minDate":      min_date,
-        "maxDate":      max_date,
-        "recordset":    recordset
-    }
-    r = requests.get(url, params=params)
-    r.raise_for_status()
-    js = r.json()["dates"]
+    return _fetch_annual(
+        session,
+        "https://search.idigbio.org/v2/summary/stats/api/",
+        recordset, min_date, max_date,
+        keep={"records"}
+    )
 
-    rows = []
-    for dt, rec in js.items():
-        metrics = rec.get(recordset, {})
-        # only include the 'records' metric
-        if 'records' in metrics:
-            rows.append({
-                "Date":   pd.to_datetime(dt),
-                "Metric": 'records',
-                "Count":  metrics['records']
-            })
-    return pd.DataFrame(rows)
-
-
-def plot_ingest_stats(df, outpath):
-    """Plot annual 'records' ingestion on a log‑scaled line chart."""
-    df = df[df["Metric"] == "records"]
 
-    plt.figure(figsize=(8, 4))
-    plt.plot(df["Date"], df["Count"], 'o-', label="records", color='C1')
-    plt.yscale("log")
-    plt.title("Data Ingestion Metrics (annual)")
-    plt.xlabel("Date")
-    plt.ylabel("Count")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(outpath)
-    plt.close()
+@skip_if_unchanged
+def plot_ingest_stats(df, outpath, fig, ax):
+    """Plot annual 'records' ingestion on a log‑scaled line chart."""
+    # pivot once to wide form and draw every column in a single call
+    w = df.pivot(index="Date", columns="Metric", values="Count").sort_index()
+    w = w[["records"]]
+
+    ax.clear()
+    fig.set_size_inches(8, 4)
+    ax.plot(w.index, w.to_numpy(), 'o-', color='C1')
+    ax.set_yscale("log")
+    ax.set_title("Data Ingestion Metrics (annual)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Count")
+    ax.legend(w.columns)
+    fig.tight_layout()
+    _savefig(fig, outpath)
+    ax.clear()
 
 
-def fetch_use_stats(recordset, min_date, max_date):
+def fetch_use_stats(session, recordset, min_date, max_date):
     """Pull annual usage (search/download/view) from iDigBio."""
-    url = "https://search.idigbio.org/v2/summary/stats/search/"
-    params = {
-        "dateInterval": "year",
-        "minDate":      min_date,
-        "maxDate":      max_date,
-        "recordset":    recordset
-    }
-    r = requests.get(url, params=params)
-    r.raise_for_status()
-    js = r.json()["dates"]
-    rows = []
-    for dt, rec in js.items():
-        m = rec.get(recordset, {})
-        for metric, cnt in m.items():
-            rows.append({
-                "Date":   pd.to_datetime(dt),
-                "Metric": metric,
-                "Count":  cnt
-            })
-    return pd.DataFrame(rows)
-
-def plot_ratios(df, outpath):
+    return _fetch_annual(
+        session,
+        "https://search.idigbio.org/v2/summary/stats/search/",
+        recordset, min_date, max_date
+    )
+
+def _ratios(w, pairs):
+    """
+    Elementwise num/den for every (num, den) column pair of w, fused into one
+    masked divide over a 2-D block; NaN wherever den is 0.
+    """
+    num = w[[n for n, _ in pairs]].to_numpy(np.float64)
+    den = w[[d for _, d in pairs]].to_numpy(np.float64)
+    out = np.full_like(num, np.nan)  # NaN leaves a gap in the line
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+@skip_if_unchanged
+def plot_ratios(df, outpath, fig, ax):
     """Compute & plot download/download_count, download/search_count, viewed_records/search_count."""
     w = df.pivot(index="Date", columns="Metric", values="Count").fillna(0)
-    # avoid division by zero
-    w["dlRatio"] = w["download"] / w["download_count"].replace(0,1)
-    w["sdRatio"] = w["download"] / w["search_count"].replace(0,1)
-    w["vsRatio"] = w["viewed_records"] / w["search_count"].replace(0,1)
-
-    plt.figure(figsize=(8,4))
+    w = w.astype(np.float64, copy=False)
+    # avoid division by zero: ratios with a zero denominator become NaN gaps
+    ratios = _ratios(w, [
+        ("download",       "download_count"),
+        ("download",       "search_count"),
+        ("viewed_records", "search_count"),
+    ])
+    w["dlRatio"], w["sdRatio"], w["vsRatio"] = ratios.T
+
+    ax.clear()
+    fig.set_size_inches(8, 4)
     for col, fmt in [("dlRatio","o-"),("sdRatio","s--"),("vsRatio","x-.")]:
-        plt.plot(w.index, w[col], fmt, label=col)
-    plt.yscale("log")
-    plt.title("Usage Ratios (annual)")
-    plt.xlabel("Date")
-    plt.ylabel("Ratio")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(outpath)
-    plt.close()
-
-def plot_annual_summary(df, outpath):
+        ax.plot(w.index, w[col], fmt, label=col)
+    ax.set_yscale("log")
+    ax.set_title("Usage Ratios (annual)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Ratio")
+    ax.legend()
+    fig.tight_layout()
+    _savefig(fig, outpath)
+    ax.clear()
+
+@skip_if_unchanged
+def plot_annual_summary(df, outpath, fig, ax):
     """
     Draw a grouped bar chart showing for each year:
       • search  (all search events)
@@ -167,22 +327,27 @@ def plot_annual_summary(df, outpath):
       • seen     (all “seen” events)
       • viewed_records (all records viewed)
     """
+    from matplotlib.ticker import FuncFormatter
+
     # 1) Prepare a year‐indexed pivot table
     df2 = df.copy()
     df2['Year'] = df2['Date'].dt.year
     # pick only our four metrics
     metrics = ['search', 'download', 'seen', 'viewed_records']
     df2 = df2[df2['Metric'].isin(metrics)]
-    pivot = df2.pivot_table(
-        index='Year', columns='Metric', values='Count', aggfunc='sum'
-    ).fillna(0)
+    pivot = (
+        df2.groupby(['Year', 'Metric'])['Count'].sum()
+        .unstack(fill_value=0)
+        .reindex(columns=metrics, fill_value=0)
+    )
 
     years = pivot.index.to_list()
     x = np.arange(len(years))
     width = 0.20
 
     # 2) Plot bars
-    fig, ax = plt.subplots(figsize=(10,6))
+    ax.clear()
+    fig.set_size_inches(10, 6)
     bar_containers = []
     for i, metric in enumerate(metrics):
         bar = ax.bar(
@@ -199,15 +364,15 @@ def plot_annual_summary(df, outpath):
 
     # --- add log scale + thousand-separator formatting:
     ax.set_yscale('log')
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f"{int(y):,}"))
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"{int(y):,}"))
 
     ax.set_ylabel("Count")
     ax.set_title("Annual Activity Summary")
     ax.legend(ncol=2, loc='upper left', bbox_to_anchor=(0,1.1))
 
-    plt.tight_layout()
-    plt.savefig(outpath, dpi=300)
-    plt.close()
+    fig.tight_layout()
+    _savefig(fig, outpath)
+    ax.clear()
 
 def main():
     parser = argparse.ArgumentParser(
@@ -243,31 +408,54 @@ def main():
     # ensure output folder exists
     os.makedirs(args.out_dir, exist_ok=True)
 
+    # one pooled session so all requests reuse the keep-alive connection
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+    # fetch everything concurrently; the script is network-bound
+    with session, ThreadPoolExecutor(max_workers=3) as pool:
+        fut_month = pool.submit(
+            fetch_monthly_usage, session, args.recordset, args.monthly_min_date
+        )
+        fut_ing = pool.submit(
+            fetch_ingest_stats, session,
+            args.recordset, args.overall_min_date, args.max_date
+        )
+        fut_use = pool.submit(
+            fetch_use_stats, session,
+            args.recordset, args.overall_min_date, args.max_date
+        )
+        df_month = fut_month.result()
+        df_ing = fut_ing.result()
+        df_use = fut_use.result()
+
+    plt = _lazy_plt()
+
+    # one Figure/Axes reused by every chart instead of rebuilding per plot
+    fig, ax = plt.subplots(figsize=(8, 4))
+
     # 1) Monthly usage
-    df_month = fetch_monthly_usage(args.recordset, args.monthly_min_date)
-    plot_usage_bar(df_month, os.path.join(args.out_dir, "usage_monthly.png"))
+    plot_usage_bar(
+        df_month, os.path.join(args.out_dir, "usage_monthly.svg"), fig, ax
+    )
 
     # 2) Annual ingestion metrics
-    df_ing = fetch_ingest_stats(
-        args.recordset,
-        args.overall_min_date,
-        args.max_date
+    plot_ingest_stats(
+        df_ing, os.path.join(args.out_dir, "ingest_metrics.png"), fig, ax
     )
-    plot_ingest_stats(df_ing, os.path.join(args.out_dir, "ingest_metrics.png"))
 
     # 5) Annual usage ratios
-    df_use = fetch_use_stats(
-        args.recordset,
-        args.overall_min_date,
-        args.max_date
+    plot_ratios(
+        df_use, os.path.join(args.out_dir, "usage_ratios.png"), fig, ax
     )
-    plot_ratios(df_use, os.path.join(args.out_dir, "usage_ratios.png"))
 
     # 6) Annual summary of four key metrics
     plot_annual_summary(
         df_use,
-        os.path.join(args.out_dir, "annual_summary.png")
+        os.path.join(args.out_dir, "annual_summary.svg"),
+        fig, ax
     )
+    plt.close(fig)
 
 
     print(f"✅ All charts generated in {args.out_dir}")